@@ -0,0 +1,77 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """Простой in-memory кэш с временем жизни записей.
+
+    Для каждого ключа держит отдельный asyncio.Lock, поэтому при
+    одновременных промахах запрос к источнику выполняется один раз,
+    а остальные вызовы получают уже сохранённое значение.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._data: dict[Hashable, tuple[Any, float]] = {}
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+
+    def _get_fresh(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return False, None
+        return True, value
+
+    async def get_or_set(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Возвращает значение из кэша или вычисляет его через factory.
+
+        Если factory бросает исключение, ничего не кэшируется.
+        """
+
+        found, value = self._get_fresh(key)
+        if found:
+            return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            found, value = self._get_fresh(key)
+            if found:
+                return value
+
+            value = await factory()
+            self._data[key] = (value, time.monotonic() + self._ttl)
+            return value
+
+
+class LRUCache:
+    """In-memory кэш фиксированного размера с вытеснением давних записей."""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Возвращает значение по ключу и помечает его как недавно использованное."""
+
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохраняет значение, вытесняя самую давнюю запись при переполнении."""
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
@@ -0,0 +1,25 @@
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+
+# .env читается один раз при импорте, дальше используются готовые значения.
+load_dotenv()
+
+
+def _require_env(name: str, hint: str) -> str:
+    """Возвращает обязательную переменную окружения или падает с подсказкой."""
+
+    value: Optional[str] = os.getenv(name)
+    if not value:
+        raise RuntimeError(hint)
+    return value
+
+
+TOKEN: str = _require_env(
+    "TOKEN",
+    "Не найден TOKEN. Создайте файл .env рядом с main.py и добавьте "
+    "строку TOKEN=ваш_токен_бота",
+)
+NEWSAPI_KEY: Optional[str] = os.getenv("NEWSAPI_KEY")
+WEATHER_API_KEY: Optional[str] = os.getenv("WEATHER_API_KEY")
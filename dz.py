@@ -6,25 +6,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 import aiohttp  
+import aiosqlite
 import logging
-import sqlite3
-from dotenv import load_dotenv
-import os
-
-def _get_token() -> str:
-    """Возвращает токен бота из окружения."""
-
-    load_dotenv()
-    token: Optional[str] = os.getenv("TOKEN")
-    if not token:
-        raise RuntimeError(
-            "Не найден TOKEN. Создайте файл .env рядом с main.py и добавьте "
-            "строку TOKEN=ваш_токен_бота"
-        )
-    return token
-
+from typing import Optional
+from config import TOKEN
 
-bot = Bot(token=_get_token())
+bot = Bot(token=TOKEN)
 dp = Dispatcher()
 
 logging.basicConfig(level=logging.INFO)
@@ -34,20 +21,118 @@ class Form(StatesGroup):
     age = State()
     grade = State()
 
-def init_db():
-	conn = sqlite3.connect('school_data.db')
-	cur = conn.cursor()
-	cur.execute('''
-	            CREATE TABLE IF NOT EXISTS users (
-	            id INTEGER PRIMARY KEY AUTOINCREMENT,
-	            name TEXT NOT NULL,
-	            age INTEGER NOT NULL,
-	            grade INTEGER NOT NULL)
-	            ''')
-	conn.commit()
-	conn.close()
- 
-init_db()
+DB_PATH = 'school_data.db'
+INSERT_USER_SQL = 'INSERT INTO users (name, age, grade) VALUES (?, ?, ?)'
+
+# Пачка записей сбрасывается в БД при наборе BATCH_MAX_ROWS строк
+# или через BATCH_MAX_DELAY секунд после первой строки пачки.
+BATCH_MAX_ROWS = 100
+BATCH_MAX_DELAY = 0.05
+
+# Долгоживущее соединение с БД: открывается при запуске бота, запросы
+# выполняются в отдельном потоке aiosqlite и не блокируют event loop.
+DB: Optional[aiosqlite.Connection] = None
+WRITE_QUEUE: asyncio.Queue = asyncio.Queue()
+WRITER_TASK: Optional[asyncio.Task] = None
+
+
+async def init_db(conn: aiosqlite.Connection) -> None:
+    # WAL позволяет читать параллельно с записью, NORMAL сокращает число
+    # fsync на коммит, busy_timeout ждёт блокировку вместо "database is locked".
+    await conn.execute('PRAGMA journal_mode=WAL')
+    await conn.execute('PRAGMA synchronous=NORMAL')
+    await conn.execute('PRAGMA busy_timeout=5000')
+    await conn.execute('PRAGMA temp_store=MEMORY')
+    await conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                age INTEGER NOT NULL,
+                grade INTEGER NOT NULL)
+                ''')
+    await conn.commit()
+
+
+async def _rollback(conn: aiosqlite.Connection) -> None:
+    """Откатывает транзакцию, не давая ошибке отката остановить запись."""
+
+    try:
+        await conn.rollback()
+    except Exception:
+        logging.exception("Не удалось откатить транзакцию")
+
+
+async def _flush_rows(conn: aiosqlite.Connection, rows: list) -> None:
+    """Записывает пачку строк одной транзакцией (один fsync на пачку).
+
+    Если пачка не записалась, строки сохраняются по одной, чтобы из-за
+    одной некорректной строки не терять остальные.
+    """
+
+    try:
+        await conn.execute('BEGIN IMMEDIATE')
+        await conn.executemany(INSERT_USER_SQL, rows)
+        await conn.commit()
+        return
+    except Exception:
+        logging.exception(
+            "Не удалось сохранить пачку из %d строк, пишем по одной", len(rows)
+        )
+        await _rollback(conn)
+
+    for row in rows:
+        try:
+            await conn.execute(INSERT_USER_SQL, row)
+            await conn.commit()
+        except Exception:
+            logging.exception("Не удалось сохранить строку %r", row)
+            await _rollback(conn)
+
+
+async def _writer_loop(conn: aiosqlite.Connection) -> None:
+    """Собирает строки из WRITE_QUEUE в пачки и сбрасывает их в БД."""
+
+    loop = asyncio.get_running_loop()
+    while True:
+        rows = [await WRITE_QUEUE.get()]
+        deadline = loop.time() + BATCH_MAX_DELAY
+        while len(rows) < BATCH_MAX_ROWS:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(await asyncio.wait_for(WRITE_QUEUE.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await _flush_rows(conn, rows)
+        except Exception:
+            # Цикл записи должен жить, иначе очередь перестанет разбираться.
+            logging.exception("Ошибка при записи %d строк в БД", len(rows))
+        finally:
+            for _ in rows:
+                WRITE_QUEUE.task_done()
+
+
+@dp.startup()
+async def on_startup():
+    global DB, WRITER_TASK
+    DB = await aiosqlite.connect(DB_PATH)
+    await init_db(DB)
+    WRITER_TASK = asyncio.create_task(_writer_loop(DB))
+
+
+@dp.shutdown()
+async def on_shutdown():
+    if WRITER_TASK is not None:
+        # Дожидаемся записи всех строк из очереди перед остановкой,
+        # если задача записи ещё жива — иначе join() не завершится.
+        if not WRITER_TASK.done():
+            await WRITE_QUEUE.join()
+        WRITER_TASK.cancel()
+    if DB is not None:
+        await DB.close()
 
 @dp.message(CommandStart())
 async def start(message: Message, state: FSMContext):
@@ -71,12 +156,7 @@ async def grade(message: Message, state:FSMContext):
     await state.update_data(grade=message.text) 
     user_data = await state.get_data()
 
-    conn = sqlite3.connect('school_data.db')
-    cur = conn.cursor()
-    cur.execute('''
-        INSERT INTO users (name, age, grade) VALUES (?, ?, ?)''', (user_data['name'], user_data['age'], user_data['grade']))
-    conn.commit()
-    conn.close()
+    await WRITE_QUEUE.put((user_data['name'], user_data['age'], user_data['grade']))
     
  
 async def main():
@@ -1,103 +1,123 @@
 import asyncio
-import os
-from typing import Optional
 
 import aiohttp
 from aiogram import Bot, Dispatcher
 from aiogram.filters import Command
 from aiogram.types import Message
-from dotenv import load_dotenv
+
+from cache import TTLCache
+from config import NEWSAPI_KEY, TOKEN
+from http_session import get_session, register_session
+from middlewares import ChatConcurrencyMiddleware, TelegramRateLimitMiddleware
 
 
 NEWSAPI_URL = "https://newsapi.org/v2/everything"
 NEWS_QUERY = "forex OR currency OR fx OR USD OR EUR"
 NEWS_PAGE_SIZE = 5
 
-def _get_token() -> str:
-    """Возвращает токен бота из окружения."""
+# Языки в порядке предпочтения: запрашиваются параллельно.
+NEWS_LANGUAGES = ("ru", "en")
+NEWS_MAX_RETRIES = 3
 
-    load_dotenv()
-    token: Optional[str] = os.getenv("TOKEN")
-    if not token:
-        raise RuntimeError(
-            "Не найден TOKEN. Создайте файл .env рядом с main.py и добавьте "
-            "строку TOKEN=ваш_токен_бота"
-        )
-    return token
+# Выдача NewsAPI меняется примерно раз в минуту.
+NEWS_CACHE_TTL = 120
+NEWS_CACHE = TTLCache(ttl=NEWS_CACHE_TTL)
 
 
-def _get_newsapi_key() -> str:
-    """Возвращает ключ NewsAPI из окружения."""
+async def _fetch_news_articles(language: str) -> list:
+    """Запрашивает у NewsAPI свежие новости по форексу на заданном языке."""
 
-    load_dotenv()
-    api_key: Optional[str] = os.getenv("NEWSAPI_KEY")
-    if not api_key:
+    if not NEWSAPI_KEY:
         raise RuntimeError(
             "Не найден NEWSAPI_KEY. Добавьте в .env строку "
             "NEWSAPI_KEY=ваш_ключ_newsapi"
         )
-    return api_key
+    session = get_session()
+    params = {
+        "q": NEWS_QUERY,
+        "language": language,
+        "sortBy": "publishedAt",
+        "pageSize": str(NEWS_PAGE_SIZE),
+    }
+    headers = {"X-Api-Key": NEWSAPI_KEY}
+
+    for attempt in range(NEWS_MAX_RETRIES + 1):
+        async with session.get(
+            NEWSAPI_URL,
+            params=params,
+            headers=headers,
+        ) as response:
+            payload = await response.json(content_type=None)
+
+        # 429: превышен лимит запросов — повторяем с экспоненциальной паузой.
+        if response.status != 429 or attempt == NEWS_MAX_RETRIES:
+            break
+        await asyncio.sleep(2**attempt)
+
+    if response.status != 200:
+        message = payload.get("message") if isinstance(payload, dict) else None
+        details = f": {message}" if isinstance(message, str) else ""
+        raise RuntimeError(f"Ошибка NewsAPI ({response.status}){details}")
+
+    articles = payload.get("articles") if isinstance(payload, dict) else None
+    if not isinstance(articles, list):
+        return []
+    return articles
+
+
+async def _cached_news_articles(language: str) -> list:
+    """Возвращает новости на заданном языке, кэшируя ответ на NEWS_CACHE_TTL."""
+
+    return await NEWS_CACHE.get_or_set(
+        ("news", language),
+        lambda: _fetch_news_articles(language),
+    )
 
 
 async def _fetch_forex_news_text() -> str:
     """Получает и форматирует 5 свежих новостей по форексу через NewsAPI."""
 
-    api_key = _get_newsapi_key()
-    timeout = aiohttp.ClientTimeout(total=15)
-
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        for language in ("ru", "en"):
-            params = {
-                "q": NEWS_QUERY,
-                "language": language,
-                "sortBy": "publishedAt",
-                "pageSize": str(NEWS_PAGE_SIZE),
-            }
-            headers = {"X-Api-Key": api_key}
-
-            async with session.get(
-                NEWSAPI_URL,
-                params=params,
-                headers=headers,
-            ) as response:
-                payload = await response.json(content_type=None)
-
-            if response.status != 200:
-                message = payload.get("message") if isinstance(payload, dict) else None
-                details = f": {message}" if isinstance(message, str) else ""
-                raise RuntimeError(f"Ошибка NewsAPI ({response.status}){details}")
-
-            articles = payload.get("articles") if isinstance(payload, dict) else None
-            if not isinstance(articles, list) or not articles:
+    results = await asyncio.gather(
+        *(_cached_news_articles(language) for language in NEWS_LANGUAGES),
+        return_exceptions=True,
+    )
+    for articles in results:
+        if isinstance(articles, BaseException):
+            raise articles
+        if not articles:
+            continue
+
+        lines: list[str] = ["Новости форекс (свежие):"]
+        for idx, item in enumerate(articles[:NEWS_PAGE_SIZE], start=1):
+            if not isinstance(item, dict):
                 continue
 
-            lines: list[str] = ["Новости форекс (свежие):"]
-            for idx, item in enumerate(articles[:NEWS_PAGE_SIZE], start=1):
-                if not isinstance(item, dict):
-                    continue
+            title = item.get("title")
+            url = item.get("url")
+            source = (item.get("source") or {}).get("name")
 
-                title = item.get("title")
-                url = item.get("url")
-                source = (item.get("source") or {}).get("name")
+            title_text = title.strip() if isinstance(title, str) else "Без заголовка"
+            url_text = url.strip() if isinstance(url, str) else ""
+            source_text = (
+                f" ({source.strip()})" if isinstance(source, str) and source else ""
+            )
 
-                title_text = title.strip() if isinstance(title, str) else "Без заголовка"
-                url_text = url.strip() if isinstance(url, str) else ""
-                source_text = (
-                    f" ({source.strip()})" if isinstance(source, str) and source else ""
-                )
+            if url_text:
+                lines.append(f"{idx}. {title_text}{source_text}\n{url_text}")
+            else:
+                lines.append(f"{idx}. {title_text}{source_text}")
 
-                if url_text:
-                    lines.append(f"{idx}. {title_text}{source_text}\n{url_text}")
-                else:
-                    lines.append(f"{idx}. {title_text}{source_text}")
-
-            return "\n\n".join(lines)
+        return "\n\n".join(lines)
 
     return "Не нашёл свежих новостей по форексу. Попробуйте позже."
 
 
-bot = Bot(token=_get_token())
+bot = Bot(token=TOKEN)
+bot.session.middleware(TelegramRateLimitMiddleware())
 dp = Dispatcher()
+dp.update.outer_middleware(ChatConcurrencyMiddleware(limit=32))
+
+register_session(dp)
 
 # Вот в этом промежутке мы будем работать и писать новый код
 
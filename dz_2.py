@@ -1,22 +1,22 @@
 import asyncio
 import logging
-import os
-from typing import Optional
 
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command, CommandStart
 from aiogram.types import CallbackQuery, Message
-from dotenv import load_dotenv
 
+from config import TOKEN
 from keyboards import (
-    CALLBACK_DYNAMIC_MORE,
-    CALLBACK_DYNAMIC_OPTION_1,
-    CALLBACK_DYNAMIC_OPTION_2,
+    DYNAMIC_ACTION_MORE,
+    DYNAMIC_ACTION_OPTION_1,
+    DYNAMIC_ACTION_OPTION_2,
+    DynamicCallback,
     get_dynamic_options_keyboard,
     get_dynamic_start_keyboard,
     get_links_keyboard,
     get_main_menu,
 )
+from middlewares import TelegramRateLimitMiddleware
 
 
 logging.basicConfig(
@@ -25,20 +25,8 @@ logging.basicConfig(
 )
 
 
-def _get_token() -> str:
-    """Возвращает токен бота из окружения."""
-
-    load_dotenv()
-    token: Optional[str] = os.getenv("TOKEN")
-    if not token:
-        raise RuntimeError(
-            "Не найден TOKEN. Создайте файл .env рядом с main.py и добавьте "
-            "строку TOKEN=ваш_токен_бота"
-        )
-    return token
-
-
-bot = Bot(token=_get_token())
+bot = Bot(token=TOKEN)
+bot.session.middleware(TelegramRateLimitMiddleware())
 dp = Dispatcher()
 
 
@@ -80,7 +68,7 @@ async def dynamic_handler(message: Message) -> None:
     )
 
 
-@dp.callback_query(F.data == CALLBACK_DYNAMIC_MORE)
+@dp.callback_query(DynamicCallback.filter(F.action == DYNAMIC_ACTION_MORE))
 async def dynamic_more_handler(callback: CallbackQuery) -> None:
     """Заменяет кнопку 'Показать больше' на две опции."""
 
@@ -91,11 +79,18 @@ async def dynamic_more_handler(callback: CallbackQuery) -> None:
     await callback.answer()
 
 
-@dp.callback_query(F.data.in_({CALLBACK_DYNAMIC_OPTION_1, CALLBACK_DYNAMIC_OPTION_2}))
-async def dynamic_option_handler(callback: CallbackQuery) -> None:
+@dp.callback_query(
+    DynamicCallback.filter(
+        F.action.in_({DYNAMIC_ACTION_OPTION_1, DYNAMIC_ACTION_OPTION_2})
+    )
+)
+async def dynamic_option_handler(
+    callback: CallbackQuery,
+    callback_data: DynamicCallback,
+) -> None:
     """Отправляет сообщение с выбранной опцией."""
 
-    if callback.data == CALLBACK_DYNAMIC_OPTION_1:
+    if callback_data.action == DYNAMIC_ACTION_OPTION_1:
         text = "Опция 1"
     else:
         text = "Опция 2"
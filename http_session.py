@@ -0,0 +1,40 @@
+from typing import Optional
+
+import aiohttp
+from aiogram import Dispatcher
+
+# Общая HTTP-сессия на всё время работы бота: пул соединений, keep-alive
+# и DNS-кэш переиспользуются между запросами.
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Возвращает общую HTTP-сессию, созданную при запуске бота."""
+
+    if _SESSION is None or _SESSION.closed:
+        raise RuntimeError("HTTP-сессия не инициализирована")
+    return _SESSION
+
+
+async def _open_session() -> None:
+    global _SESSION
+    _SESSION = aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=15),
+        connector=aiohttp.TCPConnector(
+            limit=100,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        ),
+    )
+
+
+async def _close_session() -> None:
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+
+
+def register_session(dp: Dispatcher) -> None:
+    """Создаёт сессию при запуске бота и закрывает её при остановке."""
+
+    dp.startup.register(_open_session)
+    dp.shutdown.register(_close_session)
@@ -1,12 +1,24 @@
+import functools
+
+from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton
 from aiogram.types import ReplyKeyboardMarkup
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
-CALLBACK_DYNAMIC_MORE = "dynamic_more"
-CALLBACK_DYNAMIC_OPTION_1 = "dynamic_option_1"
-CALLBACK_DYNAMIC_OPTION_2 = "dynamic_option_2"
+DYNAMIC_ACTION_MORE = "more"
+DYNAMIC_ACTION_OPTION_1 = "option_1"
+DYNAMIC_ACTION_OPTION_2 = "option_2"
+
+
+class DynamicCallback(CallbackData, prefix="dynamic"):
+    """Данные инлайн-кнопок меню /dynamic."""
+
+    action: str
 
 
+# Клавиатуры не меняются после создания, поэтому фабрики ниже строят
+# их один раз и дальше возвращают тот же объект.
+@functools.cache
 def get_main_menu() -> ReplyKeyboardMarkup:
     """Возвращает главное меню с кнопками."""
 
@@ -20,6 +32,7 @@ def get_main_menu() -> ReplyKeyboardMarkup:
     )
 
 
+@functools.cache
 def get_links_keyboard() -> InlineKeyboardMarkup:
     """Возвращает инлайн-кнопки с URL-ссылками."""
 
@@ -47,6 +60,7 @@ def get_links_keyboard() -> InlineKeyboardMarkup:
     )
 
 
+@functools.cache
 def get_dynamic_start_keyboard() -> InlineKeyboardMarkup:
     """Возвращает стартовую инлайн-клавиатуру для /dynamic."""
 
@@ -55,13 +69,14 @@ def get_dynamic_start_keyboard() -> InlineKeyboardMarkup:
             [
                 InlineKeyboardButton(
                     text="Показать больше",
-                    callback_data=CALLBACK_DYNAMIC_MORE,
+                    callback_data=DynamicCallback(action=DYNAMIC_ACTION_MORE).pack(),
                 )
             ]
         ]
     )
 
 
+@functools.cache
 def get_dynamic_options_keyboard() -> InlineKeyboardMarkup:
     """Возвращает инлайн-клавиатуру с опциями для /dynamic."""
 
@@ -70,11 +85,11 @@ def get_dynamic_options_keyboard() -> InlineKeyboardMarkup:
             [
                 InlineKeyboardButton(
                     text="Опция 1",
-                    callback_data=CALLBACK_DYNAMIC_OPTION_1,
+                    callback_data=DynamicCallback(action=DYNAMIC_ACTION_OPTION_1).pack(),
                 ),
                 InlineKeyboardButton(
                     text="Опция 2",
-                    callback_data=CALLBACK_DYNAMIC_OPTION_2,
+                    callback_data=DynamicCallback(action=DYNAMIC_ACTION_OPTION_2).pack(),
                 ),
             ]
         ]
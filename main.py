@@ -1,20 +1,31 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
 import os
 from pathlib import Path
-import subprocess
+import shutil
 import tempfile
-import html
-import re
-from typing import Optional
 
 import aiohttp
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import CommandStart, Command
 from aiogram.types import FSInputFile
 from aiogram.types import Message
-from dotenv import load_dotenv
+from gtts import gTTS
+
+from cache import LRUCache, TTLCache
+from config import TOKEN
+from http_session import get_session, register_session
+from middlewares import ChatConcurrencyMiddleware, TelegramRateLimitMiddleware
 
 IMG_DIR = Path(__file__).resolve().parent / "img"
+TTS_CACHE_DIR = Path(__file__).resolve().parent / "tts_cache"
+TTS_CACHE_MAX_FILES = 256
+
+# Синтез речи блокирует поток, поэтому выполняется в отдельном пуле,
+# чтобы не останавливать обработку других чатов.
+AUDIO_EXECUTOR = ThreadPoolExecutor(max_workers=4)
 
 KRASNODAR: dict[str, float] = {
     "latitude": 45.0355,
@@ -22,42 +33,52 @@ KRASNODAR: dict[str, float] = {
 }
 
 LIBRE_TRANSLATE_URL = "https://libretranslate.de/translate"
-GOOGLE_MOBILE_TRANSLATE_URL = "https://translate.google.com/m"
+GOOGLE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+
+# Текущая погода Open-Meteo обновляется не чаще раза в ~15 минут.
+WEATHER_CACHE_TTL = 600
+WEATHER_CACHE = TTLCache(ttl=WEATHER_CACHE_TTL)
+
+# Повторяющиеся фразы переводятся один раз.
+TRANSLATION_CACHE = LRUCache(maxsize=1024)
+
+
+_WEATHER_CODES: dict[int, str] = {
+    0: "ясно",
+    1: "преимущественно ясно",
+    2: "переменная облачность",
+    3: "пасмурно",
+    45: "туман",
+    48: "изморозь (туман)",
+    51: "лёгкая морось",
+    53: "умеренная морось",
+    55: "сильная морось",
+    56: "лёгкая переохлаждённая " "морось",
+    57: "сильная переохлаждённая " "морось",
+    61: "лёгкий дождь",
+    63: "умеренный дождь",
+    65: "сильный дождь",
+    66: "лёгкий переохлаждённый дождь",
+    67: "сильный переохлаждённый дождь",
+    71: "лёгкий снег",
+    73: "умеренный снег",
+    75: "сильный снег",
+    77: "снежные зёрна",
+    80: "лёгкие ливни",
+    81: "умеренные ливни",
+    82: "сильные ливни",
+    85: "лёгкие снегопады",
+    86: "сильные снегопады",
+    95: "гроза",
+    96: "гроза с градом (лёгким)",
+    99: "гроза с градом (сильным)",
+}
+
 
 def _weather_code_to_ru(weather_code: int) -> str:
     """Преобразует код погоды Open-Meteo в описание на русском."""
 
-    mapping: dict[int, str] = {
-        0: "ясно",
-        1: "преимущественно ясно",
-        2: "переменная облачность",
-        3: "пасмурно",
-        45: "туман",
-        48: "изморозь (туман)",
-        51: "лёгкая морось",
-        53: "умеренная морось",
-        55: "сильная морось",
-        56: "лёгкая переохлаждённая " "морось",
-        57: "сильная переохлаждённая " "морось",
-        61: "лёгкий дождь",
-        63: "умеренный дождь",
-        65: "сильный дождь",
-        66: "лёгкий переохлаждённый дождь",
-        67: "сильный переохлаждённый дождь",
-        71: "лёгкий снег",
-        73: "умеренный снег",
-        75: "сильный снег",
-        77: "снежные зёрна",
-        80: "лёгкие ливни",
-        81: "умеренные ливни",
-        82: "сильные ливни",
-        85: "лёгкие снегопады",
-        86: "сильные снегопады",
-        95: "гроза",
-        96: "гроза с градом (лёгким)",
-        99: "гроза с градом (сильным)",
-    }
-    return mapping.get(weather_code, f"неизвестно (код {weather_code})")
+    return _WEATHER_CODES.get(weather_code, f"неизвестно (код {weather_code})")
 
 
 async def _fetch_krasnodar_weather() -> str:
@@ -75,10 +96,10 @@ async def _fetch_krasnodar_weather() -> str:
     }
     timeout = aiohttp.ClientTimeout(total=10)
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.get(url, params=params) as response:
-            response.raise_for_status()
-            payload = await response.json()
+    session = get_session()
+    async with session.get(url, params=params, timeout=timeout) as response:
+        response.raise_for_status()
+        payload = await response.json()
 
     current = payload.get("current", {})
     temperature = current.get("temperature_2m")
@@ -90,8 +111,9 @@ async def _fetch_krasnodar_weather() -> str:
 
     try:
         weather_code = int(weather_code_raw)
-    except (TypeError, ValueError):
-        return "Не удалось распознать ответ сервиса погоды."
+    except (TypeError, ValueError) as exc:
+        # Исключение, а не текст ошибки: TTLCache не сохраняет неудачи.
+        raise ValueError("Некорректный ответ сервиса погоды") from exc
 
     description = _weather_code_to_ru(weather_code)
 
@@ -112,65 +134,61 @@ async def _fetch_krasnodar_weather() -> str:
     return "\n".join(parts)
 
 
-def _is_ffmpeg_available() -> bool:
-    """Проверяет, доступен ли ffmpeg в PATH."""
+async def _cached_weather() -> str:
+    """Возвращает погоду в Краснодаре, кэшируя ответ на WEATHER_CACHE_TTL."""
+
+    return await WEATHER_CACHE.get_or_set(("weather",), _fetch_krasnodar_weather)
 
-    try:
-        subprocess.run(
-            ["ffmpeg", "-version"],
-            check=False,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-    except OSError:
-        return False
 
-    return True
+@functools.cache
+def _is_ffmpeg_available() -> bool:
+    """Проверяет, доступен ли ffmpeg в PATH (результат кэшируется)."""
+
+    return shutil.which("ffmpeg") is not None
 
 
 async def _translate_to_english(text: str) -> str:
     """Переводит текст на английский через бесплатные публичные API."""
 
-    timeout = aiohttp.ClientTimeout(total=15)
+    session = get_session()
 
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.get(
-                GOOGLE_MOBILE_TRANSLATE_URL,
-                params={
-                    "sl": "auto",
-                    "tl": "en",
-                    "q": text,
-                },
-                headers={
-                    "User-Agent": (
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/120.0.0.0 Safari/537.36"
-                    )
-                },
-            ) as response:
-                response.raise_for_status()
-                page = await response.text()
-
-            match = re.search(r'class="result-container">(.*?)<', page)
-            if match:
-                translated = html.unescape(match.group(1)).strip()
-                if translated:
-                    return translated
-        except (aiohttp.ClientError, re.error):
-            pass
-
-        payload = {
-            "q": text,
-            "source": "auto",
-            "target": "en",
-            "format": "text",
-        }
-        async with session.post(LIBRE_TRANSLATE_URL, json=payload) as response:
+    try:
+        async with session.get(
+            GOOGLE_TRANSLATE_URL,
+            params={
+                "client": "gtx",
+                "sl": "auto",
+                "tl": "en",
+                "dt": "t",
+                "q": text,
+            },
+        ) as response:
             response.raise_for_status()
             data = await response.json(content_type=None)
 
+        # Ответ: [[["перевод", "исходник", ...], ...], ...]
+        segments = data[0] if isinstance(data, list) and data else None
+        if isinstance(segments, list):
+            translated = "".join(
+                seg[0]
+                for seg in segments
+                if isinstance(seg, list) and seg and isinstance(seg[0], str)
+            ).strip()
+            if translated:
+                return translated
+    except (aiohttp.ClientError, ValueError):
+        pass
+
+    payload = {
+        "q": text,
+        "source": "auto",
+        "target": "en",
+        "format": "text",
+    }
+    async with session.post(LIBRE_TRANSLATE_URL, json=payload) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+
     translated = data.get("translatedText")
     if not isinstance(translated, str) or not translated.strip():
         raise ValueError("Пустой перевод")
@@ -178,39 +196,95 @@ async def _translate_to_english(text: str) -> str:
     return translated.strip()
 
 
+async def _cached_translate_to_english(text: str) -> str:
+    """Переводит текст на английский, переиспользуя ранее полученные переводы."""
+
+    translated = TRANSLATION_CACHE.get(text)
+    if translated is None:
+        translated = await _translate_to_english(text)
+        TRANSLATION_CACHE.set(text, translated)
+    return translated
+
+
 def _synthesize_tts_mp3(text: str, mp3_path: Path) -> None:
     """Синтезирует английскую речь в MP3."""
 
-    from gtts import gTTS
-
     tts = gTTS(text=text, lang="en")
     tts.save(str(mp3_path))
 
 
-def _convert_mp3_to_ogg_opus(mp3_path: Path, ogg_path: Path) -> None:
-    """Конвертирует MP3 в OGG/OPUS (для voice-сообщений Telegram)."""
+def _evict_tts_cache() -> None:
+    """Удаляет самые давно использованные MP3 сверх TTS_CACHE_MAX_FILES."""
+
+    try:
+        files = sorted(
+            TTS_CACHE_DIR.glob("*.mp3"),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for path in files[:-TTS_CACHE_MAX_FILES]:
+            path.unlink(missing_ok=True)
+    except OSError:
+        # Кэш лишь ускоряет работу: ошибка очистки не должна мешать ответу.
+        pass
 
-    from pydub import AudioSegment
 
-    audio = AudioSegment.from_file(mp3_path, format="mp3")
-    audio.export(str(ogg_path), format="ogg", codec="libopus")
+def _get_tts_mp3(text: str, lang: str = "en") -> Path:
+    """Возвращает MP3 с озвучкой текста из дискового кэша или синтезирует его."""
 
+    digest = hashlib.sha256(f"{lang}:{text}".encode("utf-8")).hexdigest()
+    mp3_path = TTS_CACHE_DIR / f"{digest}.mp3"
+    if mp3_path.exists():
+        # mtime служит меткой последнего использования для вытеснения.
+        mp3_path.touch()
+        return mp3_path
 
-def _get_token() -> str:
-    """Возвращает токен бота из окружения."""
+    TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=TTS_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        _synthesize_tts_mp3(text, tmp_path)
+        tmp_path.replace(mp3_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
-    load_dotenv()
-    token: Optional[str] = os.getenv("TOKEN")
-    if not token:
-        raise RuntimeError(
-            "Не найден TOKEN. Создайте файл .env рядом с main.py и добавьте "
-            "строку TOKEN=ваш_токен_бота"
-        )
-    return token
+    _evict_tts_cache()
+    return mp3_path
 
 
-bot = Bot(token=_get_token())
+async def _convert_mp3_to_ogg_opus(mp3_path: Path, ogg_path: Path) -> None:
+    """Конвертирует MP3 в OGG/OPUS (для voice-сообщений Telegram)."""
+
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-loglevel",
+        "error",
+        "-y",
+        "-i",
+        str(mp3_path),
+        "-c:a",
+        "libopus",
+        "-b:a",
+        "32k",
+        "-application",
+        "voip",
+        str(ogg_path),
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        details = stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg завершился с кодом {process.returncode}: {details}")
+
+
+bot = Bot(token=TOKEN)
+bot.session.middleware(TelegramRateLimitMiddleware())
 dp = Dispatcher()
+dp.update.outer_middleware(ChatConcurrencyMiddleware(limit=32))
+
+register_session(dp)
 
 @dp.message(F.photo)
 async def save_photo(message: Message) -> None:
@@ -223,11 +297,18 @@ async def save_photo(message: Message) -> None:
 
     try:
         tg_file = await bot.get_file(photo.file_id)
-        file_path = tg_file.file_path or ""
-        suffix = Path(file_path).suffix or ".jpg"
+        if not tg_file.file_path:
+            raise ValueError("Telegram не вернул путь к файлу")
+        suffix = Path(tg_file.file_path).suffix or ".jpg"
 
         out_path = IMG_DIR / f"{photo.file_unique_id}{suffix}"
-        await bot.download(photo, destination=out_path)
+        # Файл пишется на диск кусками по мере получения, без повторного
+        # getFile, который делает bot.download.
+        await bot.download_file(
+            tg_file.file_path,
+            destination=out_path,
+            chunk_size=64 * 1024,
+        )
     except aiohttp.ClientError:
         await message.answer("Не удалось скачать фото: ошибка сети/сервиса.")
         return
@@ -240,11 +321,13 @@ async def save_photo(message: Message) -> None:
 @dp.message(Command("weather"))
 async def weather(message: Message) -> None:
     try:
-        text = await _fetch_krasnodar_weather()
+        text = await _cached_weather()
     except aiohttp.ClientError:
         text = "Не удалось получить погоду: ошибка сети/сервиса."
     except asyncio.TimeoutError:
         text = "Не удалось получить погоду: превышено время ожидания."
+    except ValueError:
+        text = "Не удалось распознать ответ сервиса погоды."
 
     await message.answer(text)
 
@@ -292,7 +375,7 @@ async def translate_and_voice(message: Message) -> None:
     source_text = message.text.strip()
 
     try:
-        translated = await _translate_to_english(source_text)
+        translated = await _cached_translate_to_english(source_text)
     except aiohttp.ClientError:
         await message.answer("Не удалось перевести текст: ошибка сети/сервиса.")
         return
@@ -302,19 +385,21 @@ async def translate_and_voice(message: Message) -> None:
 
     await message.answer(translated)
 
+    loop = asyncio.get_running_loop()
     with tempfile.TemporaryDirectory() as tmp_dir:
-        mp3_path = Path(tmp_dir) / "tts.mp3"
         ogg_path = Path(tmp_dir) / "tts.ogg"
 
         try:
-            _synthesize_tts_mp3(translated, mp3_path)
+            mp3_path = await loop.run_in_executor(
+                AUDIO_EXECUTOR, _get_tts_mp3, translated
+            )
         except Exception:
             await message.answer("Не удалось озвучить текст.")
             return
 
         if _is_ffmpeg_available():
             try:
-                _convert_mp3_to_ogg_opus(mp3_path, ogg_path)
+                await _convert_mp3_to_ogg_opus(mp3_path, ogg_path)
                 await message.answer_voice(FSInputFile(str(ogg_path)))
                 return
             except Exception:
@@ -331,6 +416,7 @@ async def main() -> None:
         pass
     finally:
         await bot.session.close()
+        AUDIO_EXECUTOR.shutdown(wait=False)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
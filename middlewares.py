@@ -0,0 +1,125 @@
+import asyncio
+import time
+import weakref
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+
+from cache import LRUCache
+
+
+class ChatConcurrencyMiddleware(BaseMiddleware):
+    """Ограничивает параллельную обработку апдейтов.
+
+    Апдейты одного чата обрабатываются строго по очереди, разные чаты —
+    параллельно, но одновременно выполняется не больше limit обработчиков.
+    """
+
+    def __init__(self, limit: int = 32) -> None:
+        self._semaphore = asyncio.Semaphore(limit)
+        # Блокировка живёт, пока её ждёт или держит хотя бы один апдейт.
+        self._chat_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        chat = data.get("event_chat")
+        if chat is None:
+            async with self._semaphore:
+                return await handler(event, data)
+
+        lock = self._chat_locks.get(chat.id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat.id] = lock
+
+        async with lock:
+            async with self._semaphore:
+                return await handler(event, data)
+
+
+class _TokenBucket:
+    """Асинхронный token bucket: не больше rate вызовов за per секунд."""
+
+    def __init__(self, rate: float, per: float = 1.0) -> None:
+        self._capacity = rate
+        self._tokens = rate
+        self._fill_rate = rate / per
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity,
+                    self._tokens + (now - self._updated_at) * self._fill_rate,
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._fill_rate)
+
+
+class TelegramRateLimitMiddleware(BaseRequestMiddleware):
+    """Ограничивает исходящие сообщения под лимиты Telegram.
+
+    Запросы, адресованные чату (с полем chat_id), проходят через общий
+    лимит global_rate в секунду и лимит chat_rate в секунду на чат.
+    При ответе 429 запрос повторяется с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        max_retries: int = 3,
+    ) -> None:
+        self._global_bucket = _TokenBucket(global_rate)
+        self._chat_rate = chat_rate
+        self._chat_buckets = LRUCache(maxsize=10_000)
+        self._max_retries = max_retries
+
+    def _get_chat_bucket(self, chat_id: Any) -> _TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = _TokenBucket(self._chat_rate)
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        attempt = 0
+        while True:
+            await self._get_chat_bucket(chat_id).acquire()
+            await self._global_bucket.acquire()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                if attempt >= self._max_retries:
+                    raise
+                await asyncio.sleep(exc.retry_after * 2**attempt)
+                attempt += 1
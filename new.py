@@ -8,36 +8,16 @@ from aiogram.fsm.storage.memory import MemoryStorage
 import aiohttp  
 import logging
 import sqlite3
-from dotenv import load_dotenv
-import os
+from config import TOKEN, WEATHER_API_KEY
 
-def _get_token() -> str:
-    """Возвращает токен бота из окружения."""
-
-    load_dotenv()
-    token: Optional[str] = os.getenv("TOKEN")
-    if not token:
-        raise RuntimeError(
-            "Не найден TOKEN. Создайте файл .env рядом с main.py и добавьте "
-            "строку TOKEN=ваш_токен_бота"
-        )
-    return token
-
-def _get_weather_api() -> str:
-    """Возвращает api из окружения."""
-
-    load_dotenv()
-    weather_api: Optional[str] = os.getenv("WEATHER_API_KEY")
-    if not weather_api:
-        raise RuntimeError(
-            "Не найден API. Создайте файл .env рядом с main.py и добавьте "
-            "строку WEATHER_API_KEY=ваш_токен_бота"
-        )
-    return weather_api
-
-bot = Bot(token=_get_token())
+bot = Bot(token=TOKEN)
 dp = Dispatcher()
-api = _get_weather_api()
+if not WEATHER_API_KEY:
+    raise RuntimeError(
+        "Не найден API. Создайте файл .env рядом с main.py и добавьте "
+        "строку WEATHER_API_KEY=ваш_токен_бота"
+    )
+api = WEATHER_API_KEY
 
 logging.basicConfig(level=logging.INFO)
 